@@ -6,13 +6,15 @@ from collections import Counter
 import logging
 import os
 import sys
-from typing import Literal, Optional, Dict, Any, Tuple
+from typing import Callable, Literal, Optional, Dict, Any, Tuple
 import time
 from concurrent.futures import ThreadPoolExecutor, wait
 import json
+import tempfile
 import threading
 
 from tqdm import tqdm
+from PIL import Image
 
 import UnityPy
 from UnityPy.files import ObjectReader
@@ -20,6 +22,13 @@ from UnityPy.classes import TextAsset, Texture2D, AudioClip, AssetBundle, Sprite
 
 ILLEGAL_CHARS_RE = re.compile(r'[<>:"/\\|?*#]')
 
+# WEBP 编码配置（Pillow 参数）：无损模式下 quality 表示压缩力度，method 为编码速度/压缩比权衡（0-6）
+WEBP_PROFILES: Dict[str, Dict[str, Any]] = {
+    "fast": {"lossless": True, "quality": 0, "method": 0},        # 快速预览，文件较大
+    "balanced": {"lossless": True, "quality": 80, "method": 4},   # Pillow 默认值
+    "archival": {"lossless": True, "quality": 100, "method": 6},  # 最高压缩比，最慢
+}
+
 def _sanitize_name(name: str) -> str:
         """替换文件名/路径中不合法的字符为下划线"""
         return ILLEGAL_CHARS_RE.sub('_', name)
@@ -48,13 +57,28 @@ def _collect_children(container: Dict[str, Any], target_parent_id: str, acc: lis
 
 
 class AssetBundleExtractor:
-    def __init__(self, input_dir, output_dir, use_logger=False, max_workers=8, logger=None, is_debug=False, skip_exists_dir=False, skip_AssetBundle=False):
+    def __init__(self, input_dir, output_dir, use_logger=False, max_workers=8, logger=None, is_debug=False, skip_exists_dir=False, skip_AssetBundle=False,
+                 text_asset_hook: Optional[Callable[[Path, str], None]] = None, write_text_asset=True,
+                 webp_profile=None, webp_reencode_profile=None):
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.use_logger = use_logger
         self.is_debug = is_debug
         self.skip_exists_dir = skip_exists_dir
         self.skip_AssetBundle = skip_AssetBundle
+        # TextAsset 回调：参数为对应的 .txt 输出路径与文本内容，在工作线程中调用
+        self.text_asset_hook = text_asset_hook
+        self.write_text_asset = write_text_asset  # 为 False 时不写出 .txt，仅调用回调
+        # 两阶段模式：先以 webp_profile（默认 fast）写出，再在后台线程池中以 webp_reencode_profile 重新编码覆盖
+        if webp_profile is None:
+            webp_profile = "fast" if webp_reencode_profile else "balanced"
+        for profile in (webp_profile, webp_reencode_profile):
+            if profile is not None and profile not in WEBP_PROFILES:
+                raise ValueError(f"未知的 WEBP 编码配置: {profile}，可选: {', '.join(WEBP_PROFILES)}")
+        if webp_reencode_profile == webp_profile:
+            raise ValueError(f"webp_reencode_profile 与 webp_profile 相同: {webp_profile}")
+        self.webp_profile = webp_profile
+        self.webp_reencode_profile = webp_reencode_profile
         self.handlers = {
             "TextAsset": self._handle_text_asset,
             "Texture2D": self._handle_texture,
@@ -68,6 +92,7 @@ class AssetBundleExtractor:
         self.processed_objects = set()
         self.file_executor = ThreadPoolExecutor(max_workers=max_workers)
         self.obj_executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.reencode_executor = ThreadPoolExecutor(max_workers=max_workers) if webp_reencode_profile else None
         self.futures = []
         self.type_counter = Counter()
         if logger:
@@ -79,6 +104,10 @@ class AssetBundleExtractor:
         self._json_locks = {}  # 路径: threading.Lock
         self._json_locks_lock = threading.Lock()  # 保护 _json_locks 字典
         self._json_cache = {}  # 新增：json缓存，key为json文件绝对路径
+        self.encode_stats = {}  # 编码配置: {"count", "seconds", "bytes"}
+        self._encode_stats_lock = threading.Lock()
+        self._claimed_paths = set()  # 本次运行已处理的图片输出路径
+        self._claimed_paths_lock = threading.Lock()
 
     def _log(self, level: Literal["debug", "info", "warning", "error"], msg: str):
         """日志"""
@@ -91,7 +120,7 @@ class AssetBundleExtractor:
             else:
                 getattr(self.logger, level)(f"{msg}")
 
-    def _prepare_output_dir(self, file_path: str) -> Path:
+    def _prepare_output_dir(self, file_path: str, check_exists=True) -> Path:
         file_path: Path = Path(file_path)
         relative_path = file_path.relative_to(self.input_dir)
         
@@ -100,7 +129,7 @@ class AssetBundleExtractor:
         
         out_dir = self.output_dir.joinpath(*sanitized_parts, sanitized_stem)
         
-        if self.skip_exists_dir and out_dir.exists() and any(out_dir.iterdir()):
+        if check_exists and self.skip_exists_dir and out_dir.exists() and any(out_dir.iterdir()):
             return None
         
         out_dir.mkdir(parents=True, exist_ok=True)
@@ -129,6 +158,16 @@ class AssetBundleExtractor:
         sanitized_res_name = _sanitize_name(res_name)
         out_base_path = out_dir / sanitized_res_name
         out_base_path = out_base_path.with_suffix(".txt")
+        # 回调在写盘前调用，不受已存在文件跳过的影响；回调失败不影响 .txt 写出
+        if self.text_asset_hook:
+            try:
+                self.text_asset_hook(out_base_path, data.m_Script)
+            except Exception as e:
+                self._log("error", f"TextAsset 回调失败: {out_base_path} | {e}")
+                self.type_counter["hook_error"] += 1
+        if not self.write_text_asset:
+            self.type_counter["text_hooked"] += 1
+            return
         if self._skip_if_exists(out_base_path): return
         # 处理普通文本
         text_bytes = data.m_Script.encode("utf-8", "replace")
@@ -143,13 +182,85 @@ class AssetBundleExtractor:
         sanitized_res_name = _sanitize_name(res_name)
         out_base_path = out_dir / sanitized_res_name
         out_path = out_base_path.with_suffix(".webp")
+        # Texture2D 与 Sprite 常常同名：本次运行中每个输出路径只处理一次
+        with self._claimed_paths_lock:
+            if out_path in self._claimed_paths:
+                self._log("debug", f"跳过本次运行已处理的同名图片: {out_path}")
+                self.type_counter["skipped"] += 1
+                return
+            self._claimed_paths.add(out_path)
+        pending_path = out_path.with_name(out_path.name + ".pending")
+        if self.reencode_executor and out_path.exists() and pending_path.exists():
+            # 上次运行在第二阶段完成前中断：第一阶段文件已存在，只需补做重新编码
+            self.reencode_executor.submit(self._reencode_webp, out_path)
+            return
         if not self._skip_if_exists(out_path):
             try:
-                data.image.save(out_path, format="WEBP", lossless=True)
+                if self.reencode_executor:
+                    pending_path.touch()
+                self._save_webp(data.image, out_path, self.webp_profile)
                 self.type_counter["image"] += 1
             except Exception as e:
                 self._log("error", f"图片保存失败: {out_path} | {e}")
                 self.type_counter["error"] += 1
+                return
+            if self.reencode_executor:
+                # 只提交路径，第二阶段从第一阶段文件重新读取（各配置均为无损，像素一致），避免排队任务持有解码后的图片
+                self.reencode_executor.submit(self._reencode_webp, out_path)
+
+    def _save_webp(self, image, out_path: Path, profile: str):
+        """按编码配置保存 WEBP（先写同目录下的唯一临时文件再替换，中断时不会留下半个文件），并记录耗时与文件大小"""
+        fd, tmp_name = tempfile.mkstemp(prefix=out_path.name + ".", suffix=".tmp", dir=out_path.parent)
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        try:
+            start = time.perf_counter()
+            image.save(tmp_path, format="WEBP", **WEBP_PROFILES[profile])
+            elapsed = time.perf_counter() - start
+            size = tmp_path.stat().st_size
+            os.replace(tmp_path, out_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        with self._encode_stats_lock:
+            stats = self.encode_stats.setdefault(profile, {"count": 0, "seconds": 0.0, "bytes": 0})
+            stats["count"] += 1
+            stats["seconds"] += elapsed
+            stats["bytes"] += size
+
+    def _reencode_webp(self, out_path: Path):
+        """
+        两阶段模式的第二阶段：从第一阶段文件读取并重新编码替换
+        完成后删除 .pending 标记；标记仍存在说明重新编码未完成，下次运行会补做
+        """
+        pending_path = out_path.with_name(out_path.name + ".pending")
+        try:
+            image = Image.open(out_path)
+            image.load()
+        except Exception as e:
+            # 第一阶段文件损坏（如旧版本中断时写了一半）：删除文件与标记，下次运行重新提取
+            self._log("error", f"第一阶段图片无法读取，已删除待下次重新提取: {out_path} | {e}")
+            self.type_counter["error"] += 1
+            out_path.unlink(missing_ok=True)
+            pending_path.unlink(missing_ok=True)
+            return
+        try:
+            with image:
+                self._save_webp(image, out_path, self.webp_reencode_profile)
+            pending_path.unlink(missing_ok=True)
+        except Exception as e:
+            self._log("error", f"图片重新编码失败: {out_path} | {e}")
+            self.type_counter["error"] += 1
+
+    def encode_summary(self) -> str:
+        """各编码配置的耗时与输出大小汇总"""
+        lines = []
+        with self._encode_stats_lock:
+            for profile, stats in self.encode_stats.items():
+                count = stats["count"]
+                avg_ms = stats["seconds"] / count * 1000 if count else 0.0
+                lines.append(f"WEBP[{profile}]: {count} 张 | 总耗时 {stats['seconds']:.2f}s | 平均 {avg_ms:.1f}ms | 总大小 {stats['bytes'] / 1024 / 1024:.2f}MB")
+        return "\n".join(lines)
 
     def _handle_audioclip(self, obj: ObjectReader, out_dir: Path):
         """处理 AudioClip 资源"""
@@ -406,6 +517,10 @@ class AssetBundleExtractor:
 
         self.pbar.close()
 
+        # 等待两阶段模式的后台重新编码完成
+        if self.reencode_executor:
+            self.reencode_executor.shutdown(wait=True)
+
         # 新增：统一写回所有缓存的json
         for json_key, tree in self._json_cache.items():
             try:
@@ -414,17 +529,29 @@ class AssetBundleExtractor:
             except Exception as e:
                 self._log("error", f"写入 GameObject.json 失败: {json_key} | {e}")
 
+        # 编码汇总不受 use_logger 控制，始终输出
+        summary = self.encode_summary()
+        if summary:
+            self.logger.info(summary)
+
         return self.type_counter
 
     def process_file(self, file_path: str):
         """处理单个 Unity 文件"""
         try:
             out_dir = self._prepare_output_dir(file_path)
+            text_only = False
             if out_dir is None:
-                self._log("info", f"跳过已存在目录: {file_path}")
                 self.type_counter["skipped"] += 1
-                self._update_pbar(1)
-                return
+                existing_dir = self._prepare_output_dir(file_path, check_exists=False)
+                if not self._hook_wants(existing_dir):
+                    self._log("info", f"跳过已存在目录: {file_path}")
+                    self._update_pbar(1)
+                    return
+                # 回调需要该目录时仍读取其中的 TextAsset，否则回调方（如一次性生成 .list）会缺少数据
+                self._log("info", f"已存在目录，仅处理 TextAsset: {file_path}")
+                out_dir = existing_dir
+                text_only = True
             env = UnityPy.load(str(file_path))
         except Exception as e:
             self._log("error", f"无法加载文件: {file_path}, {e}")
@@ -434,10 +561,22 @@ class AssetBundleExtractor:
         for obj in env.objects:
             if self.skip_AssetBundle and obj.type.name == "AssetBundle":
                 continue
+            if text_only and obj.type.name != "TextAsset":
+                continue
             self.process_object(obj, out_dir, file_path)
         
         self._log("debug", f"完成文件: {file_path}")
 
+    def _hook_wants(self, out_dir: Path) -> bool:
+        """
+        TextAsset 回调是否需要该输出目录中的 TextAsset
+        回调可提供 wants(out_dir) 方法声明所需目录，未提供时视为需要全部目录（会加载所有被跳过的文件）
+        """
+        if not self.text_asset_hook:
+            return False
+        wants = getattr(self.text_asset_hook, "wants", None)
+        return wants(out_dir) if wants else True
+
     def _handler_update_pbar(self, handler, *args, **kwargs):
         """处理资源并更新进度条"""
         try:
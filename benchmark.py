@@ -0,0 +1,396 @@
+"""
+性能基准测试：使用合成数据对三个脚本的热点路径计时
+
+- gameobject_merge: AssetBundleExtractor._handle_gameobject 的节点合并 / 孤立节点修复 / 排序
+- script_parse:     NaninovelScript 解析大型剧本（script_parse_memory 为直接传入文本）
+- webui_*:          webui.py 各路由（主页、角色页 JSON 加载与模板渲染、图片返回）
+- webp_encode_*:    各 WEBP 编码配置（WEBP_PROFILES）的编码耗时，size 为图片边长
+
+用法：
+    python benchmark.py                                  # 运行全部并写入 bench_results.json
+    python benchmark.py --only script_parse --quick      # 只运行部分基准，使用较小数据量
+    python benchmark.py --baseline old.json              # 与基线结果对比，出现回退时退出码为 1
+"""
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Any
+import argparse
+import functools
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent
+
+# 各基准的数据规模，--quick 时使用第一个
+SIZES = {
+    "gameobject_merge": [100, 500, 2000],
+    "script_parse": [1000, 10000, 50000],
+    "script_parse_memory": [1000, 10000, 50000],
+    "webui_home": [13, 100, 500],
+    "webui_character": [100, 1000, 5000],
+    "webui_image": [100, 1000, 5000],
+    "webp_encode_fast": [256, 1024, 2048],
+    "webp_encode_balanced": [256, 1024, 2048],
+    "webp_encode_archival": [256, 1024, 2048],
+}
+
+CHARACTER_NAMES = ["alisa", "anan", "coco", "ema", "hanna", "hiro", "leia", "margo", "meruru", "miria", "nanoka", "noah", "sherry"]
+PART_NAMES = ["ArmL", "ArmR", "Body", "Cheeks", "Eyes", "Mouth", "Brows", "Hair", "Effect", "Sweat"]
+
+
+def _time_it(func: Callable[[], Any], repeat: int, setup: Callable[[], Any] = None) -> Dict[str, float]:
+    """执行 func 多次，返回耗时统计（秒）。setup 的返回值会作为 func 的参数且不计入耗时"""
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+        "repeat": repeat,
+    }
+
+
+# ---------------------------------------------------------------- 合成数据
+
+def _make_vec(**kwargs):
+    return SimpleNamespace(**kwargs)
+
+
+def make_gameobject_readers(count: int, seed: int = 0) -> List[SimpleNamespace]:
+    """
+    生成模拟 UnityPy ObjectReader 的 GameObject 集合（带 Transform / SpriteRenderer 子组件）
+    层级为随机树，返回顺序被打乱，以覆盖“子节点先于父节点出现”的孤立节点修复路径
+    """
+    rng = random.Random(seed)
+    path_ids = [pid - 2**62 for pid in rng.sample(range(2**62), count)]
+    parents: Dict[int, int] = {}
+    for i, pid in enumerate(path_ids[1:], start=1):
+        parents[pid] = path_ids[rng.randrange(max(0, i - 20), i)]
+    gameobjects = {pid: SimpleNamespace(path_id=pid) for pid in path_ids}
+    transforms = {pid: SimpleNamespace(m_GameObject=gameobjects[pid]) for pid in path_ids}
+
+    readers = []
+    for i, pid in enumerate(path_ids):
+        transform = transforms[pid]
+        transform.m_LocalPosition = _make_vec(x=rng.uniform(-5, 5), y=rng.uniform(-5, 5), z=0.0)
+        transform.m_LocalRotation = _make_vec(x=0.0, y=0.0, z=0.0, w=1.0)
+        transform.m_LocalScale = _make_vec(x=1.0, y=1.0, z=1.0)
+        father = transforms.get(parents.get(pid))
+        transform.m_Father = SimpleNamespace(read=lambda father=father: father) if father else None
+
+        name = f"{rng.choice(PART_NAMES)}{i:04d}"
+        components = [SimpleNamespace(component=SimpleNamespace(
+            read=lambda transform=transform: transform,
+            type=SimpleNamespace(name="Transform"),
+        ))]
+        if rng.random() < 0.7:
+            sprite = SimpleNamespace(m_Name=name, m_PixelsToUnits=100.0, m_Pivot=_make_vec(x=0.5, y=0.5))
+            renderer = SimpleNamespace(
+                m_Sprite=SimpleNamespace(read=lambda sprite=sprite: sprite),
+                m_Materials=[],
+                m_Enabled=True,
+                m_SortingOrder=rng.randrange(100),
+                m_Color=_make_vec(r=1.0, g=1.0, b=1.0, a=1.0),
+            )
+            components.append(SimpleNamespace(component=SimpleNamespace(
+                read=lambda renderer=renderer: renderer,
+                type=SimpleNamespace(name="SpriteRenderer"),
+            )))
+        data = SimpleNamespace(m_Name=name, m_IsActive=True, m_Component=components)
+        readers.append(SimpleNamespace(path_id=pid, read=lambda data=data: data))
+    rng.shuffle(readers)
+    return readers
+
+
+def make_naninovel_script(entry_count: int, seed: int = 0) -> str:
+    """生成 Naninovel 本地化剧本文本，混合新旧两种语音标记、多行原文与备注行"""
+    rng = random.Random(seed)
+    lines = ["; localization script generated by benchmark.py"]
+    for i in range(entry_count):
+        character = rng.choice(CHARACTER_NAMES).capitalize()
+        lines.append(f"# {i:08x}")
+        roll = rng.random()
+        if roll < 0.4:
+            lines.append(f"; > {character}: |#0101Adv01_{character}{i:03d}|")
+        elif roll < 0.6:
+            lines.append(f"; > @printDebate text:\"...\" |#0206Trial09_{character}{i:03d}|")
+        elif roll < 0.7:
+            lines.append(f"; > @char {character}.Default")
+        for _ in range(rng.randint(1, 3)):
+            lines.append("; " + "あいうえお<br>かきくけこ" * rng.randint(1, 4))
+        for _ in range(rng.randint(1, 3)):
+            lines.append("<b>Translated</b> line " * rng.randint(1, 4))
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def make_character_tree(node_count: int, seed: int = 0) -> Dict[str, Any]:
+    """生成与 GameObject.json 结构一致的嵌套节点树（单一根节点）"""
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(node_count):
+        node_id = str(rng.randrange(-2**62, 2**62))
+        parent = nodes[rng.randrange(max(0, i - 20), i)] if nodes else None
+        node = {
+            "Name": f"{rng.choice(PART_NAMES)}{i:04d}",
+            "Id": node_id,
+            "ParentId": parent["Id"] if parent else None,
+            "Transform": {
+                "Position": {"x": rng.uniform(-5, 5), "y": rng.uniform(-5, 5), "z": 0.0},
+                "Rotation": {"x": 0.0, "y": 0.0, "z": 0.0, "w": 1.0},
+                "Scale": {"x": 1.0, "y": 1.0, "z": 1.0},
+            },
+            "SpriteRenderer": {
+                "Sprite": {"Name": f"Sprite{i:04d}", "PixelsToUnits": 100.0, "Pivot": {"x": 0.5, "y": 0.5}},
+                "Enabled": True,
+                "SortingOrder": rng.randrange(100),
+                "Color": {"r": 1.0, "g": 1.0, "b": 1.0, "a": 1.0},
+                "Materials": [],
+            } if rng.random() < 0.7 else None,
+            "IsActive": True,
+            "Children": {},
+        }
+        if parent:
+            parent["Children"][node_id] = node
+        nodes.append(node)
+    return {nodes[0]["Id"]: nodes[0]}
+
+
+def _random_bytes(rng: random.Random, size: int) -> bytes:
+    return rng.getrandbits(size * 8).to_bytes(size, "little")
+
+
+def make_character_dirs(base_dir: Path, profile_dir: Path, character_count: int, node_count: int, image_count: int, seed: int = 0):
+    """生成角色目录（GameObject.json + 图片）及头像目录，图片内容为随机字节，仅用于测试文件返回"""
+    rng = random.Random(seed)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(character_count):
+        name = CHARACTER_NAMES[i] if i < len(CHARACTER_NAMES) else f"extra{i:04d}"
+        char_dir = base_dir / name
+        char_dir.mkdir(exist_ok=True)
+        with open(char_dir / "GameObject.json", "w", encoding="utf-8") as f:
+            json.dump(make_character_tree(node_count, seed + i), f, ensure_ascii=False, indent=2)
+        for j in range(image_count):
+            (char_dir / f"Sprite{j:04d}.webp").write_bytes(_random_bytes(rng, rng.randint(2_000, 60_000)))
+        (profile_dir / f"Profile_{name.capitalize()}.webp").write_bytes(_random_bytes(rng, 20_000))
+
+
+def make_sprite_image(side: int, seed: int = 0):
+    """生成类似角色立绘的 RGBA 图片：透明背景上的分形纹理与渐变色块"""
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    texture = Image.effect_mandelbrot((side, side), (-2.0, -1.5, 1.0, 1.5), 100)
+    gradient = Image.linear_gradient("L").resize((side, side))
+    alpha = Image.new("L", (side, side), 0)
+    draw = ImageDraw.Draw(alpha)
+    for _ in range(8):
+        x, y = rng.randrange(side), rng.randrange(side)
+        r = rng.randrange(side // 8, side // 3)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=255)
+    return Image.merge("RGBA", (texture, gradient, gradient.rotate(90), alpha))
+
+
+# ---------------------------------------------------------------- 基准
+
+def bench_gameobject_merge(size: int, repeat: int, work_dir: Path) -> Dict[str, float]:
+    from assetbundle_extractor import AssetBundleExtractor
+    readers = make_gameobject_readers(size)
+    out_dir = work_dir / "gameobject"
+    out_dir.mkdir(exist_ok=True)
+
+    # 复用同一个提取器，每轮只重置合并状态，避免重复创建线程池
+    extractor = AssetBundleExtractor(work_dir, work_dir, max_workers=1)
+
+    def setup():
+        extractor._json_cache.clear()
+        extractor.processed_objects.clear()
+        extractor.type_counter.clear()
+        return extractor
+
+    def run(extractor):
+        for reader in readers:
+            extractor._handle_gameobject(reader, out_dir)
+
+    try:
+        return _time_it(run, repeat, setup)
+    finally:
+        extractor.file_executor.shutdown()
+        extractor.obj_executor.shutdown()
+
+
+def bench_script_parse(size: int, repeat: int, work_dir: Path) -> Dict[str, float]:
+    from voice_extractor import NaninovelScript
+    script_path = work_dir / f"script_{size}.txt"
+    script_path.write_text(make_naninovel_script(size), encoding="utf-8")
+    return _time_it(lambda: NaninovelScript(str(script_path)), repeat)
+
+
+def bench_script_parse_memory(size: int, repeat: int, work_dir: Path) -> Dict[str, float]:
+    from voice_extractor import NaninovelScript
+    script_path = work_dir / f"script_{size}.txt"
+    text = make_naninovel_script(size)
+    return _time_it(lambda: NaninovelScript(str(script_path), source=text), repeat)
+
+
+def _load_webui(base_dir: Path, profile_dir: Path):
+    """导入 webui 并将数据目录指向合成数据"""
+    import webui
+    webui.BASE_DIR = base_dir
+    webui.PROFILE_DIR = profile_dir
+    webui.app.config["TESTING"] = True
+    return webui.app.test_client()
+
+
+def _get_ok(client, url: str):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} 返回 {response.status_code}")
+    response.get_data()
+    response.close()
+
+
+def bench_webui_home(size: int, repeat: int, work_dir: Path) -> Dict[str, float]:
+    base_dir, profile_dir = work_dir / "home_characters", work_dir / "home_profiles"
+    make_character_dirs(base_dir, profile_dir, character_count=size, node_count=1, image_count=0)
+    client = _load_webui(base_dir, profile_dir)
+    return _time_it(lambda: _get_ok(client, "/"), repeat)
+
+
+def bench_webui_character(size: int, repeat: int, work_dir: Path) -> Dict[str, float]:
+    base_dir, profile_dir = work_dir / f"character_{size}", work_dir / f"character_{size}_profiles"
+    make_character_dirs(base_dir, profile_dir, character_count=1, node_count=size, image_count=0)
+    client = _load_webui(base_dir, profile_dir)
+    return _time_it(lambda: _get_ok(client, f"/character/{CHARACTER_NAMES[0]}"), repeat)
+
+
+def bench_webui_image(size: int, repeat: int, work_dir: Path) -> Dict[str, float]:
+    base_dir, profile_dir = work_dir / f"image_{size}", work_dir / f"image_{size}_profiles"
+    make_character_dirs(base_dir, profile_dir, character_count=1, node_count=1, image_count=size)
+    client = _load_webui(base_dir, profile_dir)
+    urls = [f"/images/character/{CHARACTER_NAMES[0]}/Sprite{j:04d}.webp" for j in range(size)]
+
+    def run():
+        for url in urls:
+            _get_ok(client, url)
+
+    return _time_it(run, repeat)
+
+
+def bench_webp_encode(profile: str, size: int, repeat: int, work_dir: Path) -> Dict[str, float]:
+    from assetbundle_extractor import WEBP_PROFILES
+    image = make_sprite_image(size)
+    out_path = work_dir / "sprite.webp"
+    stats = _time_it(lambda: image.save(out_path, format="WEBP", **WEBP_PROFILES[profile]), repeat)
+    stats["bytes"] = out_path.stat().st_size
+    return stats
+
+
+BENCHMARKS: Dict[str, Callable[[int, int, Path], Dict[str, float]]] = {
+    "gameobject_merge": bench_gameobject_merge,
+    "script_parse": bench_script_parse,
+    "script_parse_memory": bench_script_parse_memory,
+    "webui_home": bench_webui_home,
+    "webui_character": bench_webui_character,
+    "webui_image": bench_webui_image,
+    "webp_encode_fast": functools.partial(bench_webp_encode, "fast"),
+    "webp_encode_balanced": functools.partial(bench_webp_encode, "balanced"),
+    "webp_encode_archival": functools.partial(bench_webp_encode, "archival"),
+}
+
+
+# ---------------------------------------------------------------- 运行与对比
+
+def run_benchmarks(names: List[str], repeat: int, quick: bool = False) -> Dict[str, Any]:
+    """运行指定基准，返回可写入 JSON 的结果"""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="manosaba_bench_") as tmp:
+        for name in names:
+            sizes = SIZES[name][:1] if quick else SIZES[name]
+            for size in sizes:
+                work_dir = Path(tmp) / f"{name}_{size}"
+                work_dir.mkdir()
+                key = f"{name}[n={size}]"
+                print(f"运行 {key} ...", flush=True)
+                try:
+                    stats = BENCHMARKS[name](size, repeat, work_dir)
+                except Exception as e:
+                    # 单个基准失败（如缺少 config.settings 无法导入 webui）不影响其它基准与结果写出
+                    results[key] = {"size": size, "error": f"{type(e).__name__}: {e}"}
+                    print(f"  失败: {results[key]['error']}")
+                    continue
+                stats["size"] = size
+                results[key] = stats
+                print(f"  median {stats['median'] * 1000:.2f} ms | min {stats['min'] * 1000:.2f} ms")
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """按 median 对比当前结果与基线，打印对比表，返回回退项的 key 列表（失败的基准不参与对比）"""
+    regressions = []
+    print(f"\n{'benchmark':<32}{'baseline(ms)':>14}{'current(ms)':>14}{'ratio':>8}")
+    for key, stats in current["results"].items():
+        if "error" in stats:
+            print(f"{key:<32}{'-':>14}{'error':>14}{'-':>8}")
+            continue
+        base = baseline.get("results", {}).get(key)
+        if base is not None and "error" in base:
+            base = None
+        if base is None:
+            print(f"{key:<32}{'-':>14}{stats['median'] * 1000:>14.2f}{'-':>8}")
+            continue
+        ratio = stats["median"] / base["median"] if base["median"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            flag = "  <-- 回退"
+        print(f"{key:<32}{base['median'] * 1000:>14.2f}{stats['median'] * 1000:>14.2f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Manosaba Character Composer 性能基准测试")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS), help="只运行指定基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每个规模重复次数")
+    parser.add_argument("--quick", action="store_true", help="每个基准只运行最小规模")
+    parser.add_argument("--output", default="bench_results.json", help="结果输出路径")
+    parser.add_argument("--baseline", help="基线结果 JSON，对比并在回退时返回非零退出码")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的相对变慢比例（默认 0.2 即 20%%）")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT_DIR))
+    results = run_benchmarks(args.only, args.repeat, args.quick)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n发现 {len(regressions)} 项性能回退: {', '.join(regressions)}")
+            return 1
+        print("\n未发现性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,4 +7,8 @@ if "debugpy" in sys.modules:
 HOST = "0.0.0.0"
 PORT = 5005
 BASE_DIR = r"characters"  # 角色数据目录
-PROFILE_DIR = r"profiles"  # 头像目录
\ No newline at end of file
+PROFILE_DIR = r"profiles"  # 头像目录
+# 慢请求剖析：设置为毫秒阈值以启用（None 为关闭），按 PROFILER_SAMPLE_RATE 比例采样请求
+PROFILER_SLOW_MS = None
+PROFILER_SAMPLE_RATE = 1.0
+PROFILER_OUTPUT_DIR = r"profiles_slow"  # 慢请求 .prof 输出目录
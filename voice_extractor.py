@@ -1,9 +1,13 @@
 from dataclasses import dataclass, asdict
-from typing import List, Optional
+from contextlib import nullcontext
+from typing import Iterable, List, Optional, TextIO, Union
 import re
+import io
 import json
 import os
 import glob
+import fnmatch
+import threading
 from collections import defaultdict
 
 @dataclass
@@ -50,16 +54,28 @@ class NaninovelScript:
             return match.group(1)
         return None
 
-    def __init__(self, file_path: str):
-        self.file_path = file_path
-        file_dir = os.path.dirname(file_path)
-        self.id = os.path.splitext(os.path.basename(file_path))[0]
+    def __init__(self, file_path: str, source: Union[str, TextIO, None] = None):
+        """
+        file_path: 剧本路径，用于生成 id 与元数据；未提供 source 时从该路径读取
+        source: 可选，剧本文本（str）或文本流，提供时直接解析而不读取磁盘
+        """
+        self.file_path = str(file_path)
+        file_dir = os.path.dirname(self.file_path)
+        self.id = os.path.splitext(os.path.basename(self.file_path))[0]
         self.metadata = ScriptMetadata(file_path=self.file_path, id=self.id, file_dir=file_dir)
         self.entries: List[NaninovelEntry] = []
         self.other_remarks: List[str] = []  # 储存所有 ; > 开头的内容
-        self._parse()
+        self._parse(source)
 
-    def _parse(self):
+    def _open_source(self, source: Union[str, TextIO, None]):
+        """返回可逐行迭代的上下文：文本、外部传入的流（不负责关闭）或磁盘文件"""
+        if source is None:
+            return open(self.file_path, "r", encoding="utf-8")
+        if isinstance(source, str):
+            return io.StringIO(source, newline=None)  # 与 open() 一致地转换 \r / \r\n
+        return nullcontext(source)
+
+    def _parse(self, source: Union[str, TextIO, None] = None):
         current_entry_id = None
         source_lines = []
         translation_lines = []
@@ -68,7 +84,7 @@ class NaninovelScript:
         first_line = True
         reading_translation = False
 
-        with open(self.file_path, "r", encoding="utf-8") as f:
+        with self._open_source(source) as f:
             for line in f:
                 line = line.rstrip()
                 if not line:
@@ -150,33 +166,80 @@ class NaninovelScript:
                 "entries": [asdict(e) for e in self.entries]
             }, f, ensure_ascii=False, indent=2)
 
-# 使用示例
-if __name__ == "__main__":
-    input_dir = r"D:\manosaba"
-    output_dir = r"D:\manosaba_voice_lists"
-    os.makedirs(output_dir, exist_ok=True)
-    character_map = defaultdict(list)
-    files = glob.glob(os.path.join(input_dir, "general-localization-*-scripts-*", "*.txt"))
-    for file in files:
-        print(f"Processing file: {file}")
-        script = NaninovelScript(file)
+LOCALIZATION_DIR_PATTERN = "general-localization-*-scripts-*"
+
+
+class LocalizationScriptCollector:
+    """
+    作为 AssetBundleExtractor 的 text_asset_hook 使用：
+    将 general-localization-* 目录下的 TextAsset 直接在内存中解析为 NaninovelScript
+    """
+    def __init__(self, dir_pattern: str = LOCALIZATION_DIR_PATTERN):
+        self.dir_pattern = dir_pattern
+        self.scripts: List[NaninovelScript] = []
+        self._lock = threading.Lock()  # 回调在提取器的工作线程中调用
+
+    def wants(self, out_dir) -> bool:
+        """供提取器判断 skip_exists_dir 跳过的目录是否仍需读取 TextAsset"""
+        return fnmatch.fnmatch(os.path.basename(out_dir), self.dir_pattern)
+
+    def __call__(self, txt_path, text: str):
+        if not self.wants(os.path.dirname(txt_path)):
+            return
+        script = NaninovelScript(txt_path, source=text)
+        with self._lock:
+            self.scripts.append(script)
+
+
+def collect_voice_lines(scripts: Iterable[NaninovelScript], voice_root: str, character_map=None):
+    """按角色收集存在对应语音文件的条目，返回 角色 -> .list 行 的映射"""
+    if character_map is None:
+        character_map = defaultdict(list)
+    for script in scripts:
         # 输出所有 ; > 开头的内容
         if script.other_remarks:
-            print(f"> lines in {file}:")
+            print(f"> lines in {script.file_path}:")
             for remark in script.other_remarks:
                 print(remark)
         dir_name = script.metadata.file_dir.split('-')[-1]
         if dir_name == "common_assets_all":
-            voice_dir = os.path.join(input_dir, f"general-voice-{script.id.lower()}_assets_all")
+            voice_dir = os.path.join(voice_root, f"general-voice-{script.id.lower()}_assets_all")
         else:
-            voice_dir = os.path.join(input_dir, f"general-voice-{dir_name}")
+            voice_dir = os.path.join(voice_root, f"general-voice-{dir_name}")
         for entry in script.entries:
             if entry.character and entry.voice_id:
                 voice_path = os.path.join(voice_dir, entry.voice_id, f"{entry.voice_id}.wav")
                 if os.path.exists(voice_path):
                     character_map[entry.character].append(f"{voice_path}|slicer_opt|JP|{entry.source_plain}")
-                
+    return character_map
+
+
+def write_voice_lists(character_map, output_dir: str):
+    """为每个角色写出 .list 文件"""
+    os.makedirs(output_dir, exist_ok=True)
     for character, voices in character_map.items():
         with open(os.path.join(output_dir, f"{character}.list"), "w", encoding="utf-8") as f:
             for voice in voices:
-                f.write(voice + "\n")
\ No newline at end of file
+                f.write(voice + "\n")
+
+
+# 使用示例
+if __name__ == "__main__":
+    input_dir = r"D:\manosaba"
+    output_dir = r"D:\manosaba_voice_lists"
+    # 设置为 AssetBundle 目录时，提取与剧本解析一次完成，剧本不经过 .txt 中转
+    bundle_dir = None
+
+    if bundle_dir:
+        from assetbundle_extractor import AssetBundleExtractor
+        collector = LocalizationScriptCollector()
+        AssetBundleExtractor(bundle_dir, input_dir, use_logger=True, text_asset_hook=collector, write_text_asset=False).extract_all()
+        scripts = sorted(collector.scripts, key=lambda s: s.file_path)
+    else:
+        files = glob.glob(os.path.join(input_dir, LOCALIZATION_DIR_PATTERN, "*.txt"))
+        scripts = []
+        for file in files:
+            print(f"Processing file: {file}")
+            scripts.append(NaninovelScript(file))
+
+    write_voice_lists(collect_voice_lines(scripts, input_dir), output_dir)
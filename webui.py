@@ -1,12 +1,163 @@
-from flask import Flask, send_from_directory, render_template
+from flask import Flask, send_from_directory, render_template, request, g, Response
 from pathlib import Path
+from collections import defaultdict
+from contextlib import contextmanager
+import cProfile
 import json
+import random
+import threading
+import time
+import config.settings as settings
 from config.settings import BASE_DIR, PROFILE_DIR, HOST, PORT
 BASE_DIR = Path(BASE_DIR)
 PROFILE_DIR = Path(PROFILE_DIR)
 
+# 慢请求剖析（可选）：设置 PROFILER_SLOW_MS 后按 PROFILER_SAMPLE_RATE 比例对请求做 cProfile，
+# 耗时超过阈值的请求将 .prof 文件写入 PROFILER_OUTPUT_DIR（可用 snakeviz / pstats 查看）
+PROFILER_SLOW_MS = getattr(settings, "PROFILER_SLOW_MS", None)
+PROFILER_SAMPLE_RATE = getattr(settings, "PROFILER_SAMPLE_RATE", 1.0)
+PROFILER_OUTPUT_DIR = Path(getattr(settings, "PROFILER_OUTPUT_DIR", "profiles_slow"))
+
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
+
+class RequestMetrics:
+    """按路由统计请求耗时直方图、分阶段耗时、响应大小与状态码，输出 Prometheus 文本格式"""
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = defaultdict(lambda: [[0] * len(self.BUCKETS), 0.0, 0])  # (route, method) -> [桶计数, 总和, 次数]
+        self.phases = defaultdict(lambda: [0.0, 0])  # (route, phase) -> [总和, 次数]
+        self.statuses = defaultdict(int)  # (route, method, status) -> 次数
+        self.response_bytes = defaultdict(int)  # route -> 字节数
+        self.cache_hits = defaultdict(int)  # route -> 304 次数
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float, size: int):
+        with self._lock:
+            hist = self.durations[(route, method)]
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    hist[0][i] += 1
+            hist[1] += seconds
+            hist[2] += 1
+            self.statuses[(route, method, status)] += 1
+            self.response_bytes[route] += size
+            if status == 304:
+                self.cache_hits[route] += 1
+
+    def observe_phase(self, route: str, phase: str, seconds: float):
+        with self._lock:
+            stat = self.phases[(route, phase)]
+            stat[0] += seconds
+            stat[1] += 1
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines += ["# HELP webui_request_duration_seconds 请求处理耗时",
+                      "# TYPE webui_request_duration_seconds histogram"]
+            for (route, method), (buckets, total, count) in sorted(self.durations.items()):
+                for bound, n in zip(self.BUCKETS, buckets):
+                    lines.append(f"webui_request_duration_seconds_bucket{self._labels(route=route, method=method, le=bound)} {n}")
+                lines.append(f"webui_request_duration_seconds_bucket{self._labels(route=route, method=method, le='+Inf')} {count}")
+                lines.append(f"webui_request_duration_seconds_sum{self._labels(route=route, method=method)} {total}")
+                lines.append(f"webui_request_duration_seconds_count{self._labels(route=route, method=method)} {count}")
+
+            lines += ["# HELP webui_phase_duration_seconds 路由内各阶段耗时（JSON 加载、文件系统、模板渲染等）",
+                      "# TYPE webui_phase_duration_seconds summary"]
+            for (route, phase), (total, count) in sorted(self.phases.items()):
+                lines.append(f"webui_phase_duration_seconds_sum{self._labels(route=route, phase=phase)} {total}")
+                lines.append(f"webui_phase_duration_seconds_count{self._labels(route=route, phase=phase)} {count}")
+
+            lines += ["# HELP webui_requests_total 按状态码统计的请求数",
+                      "# TYPE webui_requests_total counter"]
+            for (route, method, status), n in sorted(self.statuses.items()):
+                lines.append(f"webui_requests_total{self._labels(route=route, method=method, status=status)} {n}")
+
+            lines += ["# HELP webui_response_bytes_total 响应体字节数",
+                      "# TYPE webui_response_bytes_total counter"]
+            for route, n in sorted(self.response_bytes.items()):
+                lines.append(f"webui_response_bytes_total{self._labels(route=route)} {n}")
+
+            lines += ["# HELP webui_cache_hits_total 客户端缓存命中（304）次数",
+                      "# TYPE webui_cache_hits_total counter"]
+            for route, n in sorted(self.cache_hits.items()):
+                lines.append(f"webui_cache_hits_total{self._labels(route=route)} {n}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = RequestMetrics()
+
+
+def _route_label() -> str:
+    """使用路由规则而非实际路径作为标签，避免标签数量随角色/图片增长"""
+    return request.url_rule.rule if request.url_rule else "<unmatched>"
+
+
+@contextmanager
+def timed_phase(phase: str):
+    """记录当前请求中某一阶段的耗时"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe_phase(_route_label(), phase, time.perf_counter() - start)
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = None
+    if PROFILER_SLOW_MS is not None and random.random() < PROFILER_SAMPLE_RATE:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            g.profiler = profiler
+        except ValueError:
+            pass  # 同一时刻只能有一个剖析器（Python 3.12+），跳过本次采样
+
+
+@app.after_request
+def _record_request(response):
+    start = g.pop("request_start", None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = _route_label()
+    # 304 与 HEAD 不发送响应体，但 content_length 仍为文件大小
+    size = 0 if response.status_code == 304 or request.method == "HEAD" else response.content_length or 0
+    metrics.observe_request(route, request.method, response.status_code, elapsed, size)
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        if elapsed * 1000 >= PROFILER_SLOW_MS:
+            PROFILER_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+            endpoint = request.endpoint or "unmatched"
+            # time_ns 保证同一秒内同一路由的多个慢请求不会互相覆盖
+            profiler.dump_stats(PROFILER_OUTPUT_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}_{endpoint}_{elapsed * 1000:.0f}ms_{time.time_ns()}.prof")
+    return response
+
+
+@app.teardown_request
+def _stop_profiler(exc):
+    # after_request 未执行时（如其中抛出异常）确保剖析器被关闭
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+
+
+@app.route("/metrics")
+def metrics_page():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
 def get_data_dir(character):
     return BASE_DIR / character
 
@@ -14,25 +165,28 @@ def get_data_dir(character):
 def home():
     allowed_characters = ["alisa", "anan", "coco", "ema", "hanna", "hiro", "leia", "margo", "meruru", "miria", "nanoka", "noah", "sherry"]
     characters = []
-    if BASE_DIR.exists():
-        for item in BASE_DIR.iterdir():
-            if item.is_dir():
-                character_name = item.name
-                if character_name in allowed_characters:
-                    profile_path = PROFILE_DIR / f"Profile_{character_name.capitalize()}.webp"
-                    profile_url = f"/api/profile/{character_name}" if profile_path.exists() else "/static/default.webp"
-                    characters.append({"name": character_name, "profile": profile_url})
-    return render_template("home.html", characters=characters)
+    with timed_phase("fs_scan"):
+        if BASE_DIR.exists():
+            for item in BASE_DIR.iterdir():
+                if item.is_dir():
+                    character_name = item.name
+                    if character_name in allowed_characters:
+                        profile_path = PROFILE_DIR / f"Profile_{character_name.capitalize()}.webp"
+                        profile_url = f"/api/profile/{character_name}" if profile_path.exists() else "/static/default.webp"
+                        characters.append({"name": character_name, "profile": profile_url})
+    with timed_phase("render"):
+        return render_template("home.html", characters=characters)
 
 @app.route("/character/<character>")
 def character_page(character):
     data_dir = get_data_dir(character)
     json_path = data_dir / "GameObject.json"
     if json_path.exists():
-        with open(json_path, "r", encoding="utf-8") as f:
+        with timed_phase("json_load"), open(json_path, "r", encoding="utf-8") as f:
             data = json.load(f)
         root_node = list(data.values())[0]
-        return render_template("character.html", character=character, root_node=root_node)
+        with timed_phase("render"):
+            return render_template("character.html", character=character, root_node=root_node)
     else:
         return "Character not found", 404
 
@@ -47,9 +201,12 @@ def get_profile(character):
 def get_image(character, path):
     data_dir = get_data_dir(character)
     img_path = data_dir / path
-    if not img_path.exists():
+    with timed_phase("fs_stat"):
+        exists = img_path.exists()
+    if not exists:
         return "Not Found", 404
-    return send_from_directory(data_dir, path)
+    with timed_phase("send_file"):
+        return send_from_directory(data_dir, path)
 
 if __name__ == "__main__":
     app.run(host=HOST, port=PORT, debug=True)